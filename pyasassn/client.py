@@ -2,6 +2,8 @@ from __future__ import division, print_function
 from base64 import encodebytes
 from glob import glob
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import json
 import numpy as np
@@ -13,6 +15,9 @@ from time import sleep
 
 from .collection import LightCurveCollection
 
+# Conversion factors from arc units to decimal degrees
+_ARC_FACTORS = {"deg": 1.0, "arcmin": 1 / 60.0, "arcsec": 1 / 3600.0}
+
 
 class SkyPatrolClient:
     """
@@ -30,22 +35,35 @@ class SkyPatrolClient:
         """
         self.index = None
         self.verbose = verbose
+
+        # Reuse connections across queries (HTTP keep-alive) and retry transient gateway errors
+        self._session = requests.Session()
+        self._session.mount(
+            "http://",
+            HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=16,
+                max_retries=Retry(
+                    total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]
+                ),
+            ),
+        )
         try:
             url = "http://asassn-lb01.ifa.hawaii.edu:9006/get_current_message"
-            url_data = requests.get(url).content
+            url_data = self._session.get(url).content
             self.message = url_data.decode()
             self._verbose_print(self.message)
 
             url = "http://asassn-lb01.ifa.hawaii.edu:9006/get_schema"
-            url_data = requests.get(url).content
+            url_data = self._session.get(url).content
             schema = json.loads(url_data)
 
             url = "http://asassn-lb01.ifa.hawaii.edu:9006/get_counts"
-            url_data = requests.get(url).content
+            url_data = self._session.get(url).content
             counts = json.loads(url_data)
 
             url = "http://asassn-lb01.ifa.hawaii.edu:9006/get_block_servers"
-            url_data = requests.get(url).content
+            url_data = self._session.get(url).content
             self.block_servers = json.loads(url_data)
 
             self.catalogs = SkyPatrolClient.InputCatalogs(schema, counts)
@@ -80,7 +98,7 @@ class SkyPatrolClient:
 
         # Query API with list (POST METHOD)
         url = f"http://asassn-lb01.ifa.hawaii.edu:9006/lookup_solar_system/{obj_name}"
-        response = requests.post(
+        response = self._session.post(
             url,
             json={
                 "format": "arrow",
@@ -103,7 +121,7 @@ class SkyPatrolClient:
             if save_dir:
                 self._save_index(save_dir, file_format)
             # Get lightcurve ids to pull
-            tar_ids = list(tar_df["mpc_entry"])
+            tar_ids = tar_df["mpc_entry"]
 
             # Generate query information
             query_id = "solar--" + obj_name
@@ -140,7 +158,7 @@ class SkyPatrolClient:
 
         # url_name = urllib.parse.quote_plus(name)
         url = f"http://asassn-lb01.ifa.hawaii.edu:9006/simbad_lookup/{obj_name}"
-        response = requests.post(
+        response = self._session.post(
             url,
             json={
                 "format": "arrow",
@@ -162,7 +180,7 @@ class SkyPatrolClient:
             if save_dir:
                 self._save_index(save_dir, file_format)
             # Get lightcurve ids to pull
-            tar_ids = list(tar_df["asas_sn_id"])
+            tar_ids = tar_df["asas_sn_id"]
 
             # Generate query information
             query_id = obj_name
@@ -202,7 +220,7 @@ class SkyPatrolClient:
 
         # Query Flask API with SQL bytes
         url = f"http://asassn-lb01.ifa.hawaii.edu:9006/lookup_sql/{query_hash}"
-        response = requests.post(url, json={"format": "arrow", "download": download})
+        response = self._session.post(url, json={"format": "arrow", "download": download})
 
         self._validate_response(response)
 
@@ -229,7 +247,7 @@ class SkyPatrolClient:
             else:
                 raise ValueError("needs propper id column to download lightcurves")
             # Get tar ids
-            tar_ids = list(tar_df[id_col])
+            tar_ids = tar_df[id_col]
 
             # Returns a LightCurveCollection object, or a list of light curve files when save_dir is set
             return self._get_curves(
@@ -296,12 +314,14 @@ class SkyPatrolClient:
             )
 
         # Change units
-        if units != "deg":
-            radius = _arc_to_deg(float(radius), units)
+        try:
+            radius = float(radius) * _ARC_FACTORS[units]
+        except KeyError:
+            raise ValueError("units not in ['deg', 'arcmin', 'arcsec']")
 
         # Query the Flask server API for cone
         url = f"http://asassn-lb01.ifa.hawaii.edu:9006/lookup_cone/radius{radius}_ra{ra_deg}_dec{dec_deg}"
-        response = requests.post(
+        response = self._session.post(
             url,
             json={
                 "catalog": catalog,
@@ -332,7 +352,7 @@ class SkyPatrolClient:
             query_hash = encodebytes(bytes(query_id, encoding="utf-8")).decode()
 
             # Get lightcurve ids to pull
-            tar_ids = list(tar_df["asas_sn_id"])
+            tar_ids = tar_df["asas_sn_id"]
 
             # Returns a LightCurveCollection object, or a list of light curve files when save_dir is set
             return self._get_curves(
@@ -411,7 +431,7 @@ class SkyPatrolClient:
 
         # Query API with list (POST METHOD)
         url = f"http://asassn-lb01.ifa.hawaii.edu:9006/lookup_targets/catalog_list"
-        response = requests.post(
+        response = self._session.post(
             url,
             json={
                 "tar_ids": target_ids,
@@ -445,7 +465,7 @@ class SkyPatrolClient:
             query_hash = encodebytes(bytes(query_id, encoding="utf-8")).decode()
 
             # Get lightcurve ids to pull
-            tar_ids = list(tar_df["asas_sn_id"])
+            tar_ids = tar_df["asas_sn_id"]
 
             # Returns a LightCurveCollection object, or a list of light curve files when save_dir is set
             return self._get_curves(
@@ -514,7 +534,7 @@ class SkyPatrolClient:
 
         # Query API with list (POST METHOD)
         url = f"http://asassn-lb01.ifa.hawaii.edu:9006/lookup_targets/random_{n}"
-        response = requests.post(
+        response = self._session.post(
             url,
             json={
                 "catalog": catalog,
@@ -538,7 +558,7 @@ class SkyPatrolClient:
             if save_dir:
                 self._save_index(save_dir, file_format)
             # Get lightcurve ids to pull
-            tar_ids = list(tar_df["asas_sn_id"])
+            tar_ids = tar_df["asas_sn_id"]
 
             # Generate query information
             query_id = f"random-{n}|catalog-{catalog}|cols-" + "/".join(cols)
@@ -552,7 +572,8 @@ class SkyPatrolClient:
     def _get_curves(
         self, query_hash, tar_ids, catalog, save_dir, file_format, threads=1
     ):
-        # Get number of id chunks
+        # Get number of id chunks (blocks are resolved server-side from the query hash,
+        # so the ids themselves never need to be boxed into a python list)
         n_chunks = int(np.ceil(len(tar_ids) / 1000))
         self._verbose_print("Downloading Curves...")
         # Get targets via mutlithreaded requests
@@ -611,7 +632,7 @@ class SkyPatrolClient:
                     f"http://{self.block_servers[server_idx]}:9006/get_block/"
                     f"query_hash-{query_hash}-block_idx-{block_idx}-catalog-{catalog}"
                 )
-                response = requests.get(url)
+                response = self._session.get(url)
 
                 # Pandas dataframe
                 data = _deserialize(response.content)
@@ -637,6 +658,11 @@ class SkyPatrolClient:
         # Write to disk or return in memory
         if save_dir is not None:
             lcs = LightCurveCollection(data, self.index, id_col)
+            if file_format == "parquet":
+                # Write the whole block as one compressed file rather than one file per target
+                file = os.path.join(save_dir, f"block_{block_idx}.parq")
+                lcs.data.to_parquet(file, compression="zstd", index=False)
+                return [file], count
             return lcs.save(save_dir, file_format, include_index=False), count
         else:
             return data, count
@@ -673,15 +699,26 @@ class SkyPatrolClient:
         """
 
         def __init__(self, schema, counts):
-            for name, col_data in schema.items():
-                self.__dict__[name] = pd.DataFrame(col_data)
+            # Tables are kept as received and only built into DataFrames when first accessed
+            self._raw = schema
+            self._cache = {}
             self.counts = counts
 
+        def __getattr__(self, name):
+            """Expose all tables as attributes."""
+            if name in self.__dict__.get("_raw", {}):
+                return self._table(name)
+            raise AttributeError(f"object has no attribute {name}")
+
+        def _table(self, name):
+            if name not in self._cache:
+                self._cache[name] = pd.DataFrame(self._raw[name])
+            return self._cache[name]
+
         def __str__(self):
             rep_str = "\n"
-            for table_name, df in self.__dict__.items():
-                if table_name == "counts":
-                    continue
+            for table_name in self._raw:
+                df = self._table(table_name)
                 rep_str += (
                     f"Table Name:  {table_name}\n"
                     f"Num Columns: {len(df)}\n"
@@ -692,12 +729,15 @@ class SkyPatrolClient:
 
         def __repr__(self):
             rep_str = "\n"
-            for table_name, df in self.__dict__.items():
-                if table_name == "counts":
-                    continue
+            for table_name, col_data in self._raw.items():
+                # Count rows without building the table
+                if isinstance(col_data, dict):
+                    num_rows = len(next(iter(col_data.values()), []))
+                else:
+                    num_rows = len(col_data)
                 rep_str += (
                     f"Table Name:  {table_name}\n"
-                    f"Num Columns: {len(df)}\n"
+                    f"Num Columns: {num_rows}\n"
                     f"Num Targets: {self.counts[table_name]}\n\n"
                 )
             return rep_str
@@ -708,10 +748,10 @@ class SkyPatrolClient:
 
             :return: names of all input catalogs (list)
             """
-            return self.__dict__.keys()
+            return self._raw.keys()
 
         def __getitem__(self, item):
-            return self.__dict__[item]
+            return self._table(item)
 
 
 def _deserialize(buffer):
@@ -727,12 +767,9 @@ def _arc_to_deg(arc, unit):
     :param unit: 'arcmin' or 'arcsec'
     :return: decimal degrees
     """
-    if unit == "arcmin":
-        return arc / 60
-    elif unit == "arcsec":
-        return arc / 3600
-    else:
+    if unit not in ["arcmin", "arcsec"]:
         raise ValueError("unit not in ['arcmin', 'arcsec']")
+    return arc * _ARC_FACTORS[unit]
 
 
 def load_collection(save_dir, file_format="parquet"):
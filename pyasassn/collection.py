@@ -1,12 +1,16 @@
 from __future__ import division, print_function
 import os
+from concurrent.futures import ThreadPoolExecutor
 from astropy.timeseries import LombScargle
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 
 from .lightcurve import LightCurve
-from .utils import Vcams, gcams
+from .utils import Vcams, gcams, _column_fingerprint
 
 
 class LightCurveCollection(object):
@@ -25,25 +29,92 @@ class LightCurveCollection(object):
         )
         self.data = self.data[self.data["phot_filter"].notna()]
 
+        # Categorical ids and labels let grouped reductions and filters work on integer codes
+        categorical = [self.id_col, "phot_filter", "quality"]
+        self.data = self.data.astype(
+            {col: "category" for col in categorical if col in self.data.columns}
+        )
+
+        # Keep the rows of each curve contiguous, in id order
+        self.data = self.data.sort_values(self.id_col, kind="stable", ignore_index=True)
+
+        # Row positions of each curve and boolean filter masks, built on first use. As for LightCurve,
+        # each public method checks once that the data is unchanged, and the helpers trust the cache.
+        self._cache = {}
+        self._cached_fingerprint = None
+
     def __repr__(self):
         f = f"LightCurveCollection with {len(self)} light curves \n"
         return f + self.catalog_info.__repr__()
         # return f"LightCurveCollection with {len(self)} light curves"
 
     def __getitem__(self, item):
-        if type(item) == pd.Series or type(item) == list or type(item) == np.ndarray:
-            data = self.data[self.data[self.id_col] in item]
-            catalog_info = self.catalog_info[self.catalog_info[self.id_col] in item]
+        self._refresh_cache()
+        if isinstance(item, (list, tuple, set, np.ndarray, pd.Series, pd.Index)):
+            # Hash the requested ids once and probe both frames with a vectorized membership test
+            item = pd.Index(list(item) if isinstance(item, set) else item)
+            data = self.data[self.data[self.id_col].isin(item)]
+            catalog_info = self.catalog_info[self.catalog_info[self.id_col].isin(item)]
             return LightCurveCollection(data, catalog_info, self.id_col)
         else:
             return self.__get_lc(item)
 
     def __get_lc(self, key):
-        source = self.catalog_info[self.id_col] == key
-        meta = self.catalog_info[source]
-        data = self.data[self.data[self.id_col] == key]
+        return self._curve(key, self._groups.get(key, []))
+
+    def _curve(self, key, idx):
+        """
+        Light curve of one id from its row positions in data.
+        """
+        meta = self.catalog_info.take(self._meta_groups.get(key, []))
+        data = self.data.take(idx)
+
+        # A single curve holds the plain id values rather than every category of the collection
+        ids = data[self.id_col]
+        if isinstance(ids.dtype, pd.CategoricalDtype):
+            data[self.id_col] = ids.astype(ids.cat.categories.dtype)
         return LightCurve(data, meta)
 
+    @property
+    def _groups(self):
+        """
+        Row positions of each curve in data, keyed by id.
+        """
+        return self._row_positions("data", observed=True)
+
+    @property
+    def _meta_groups(self):
+        """
+        Row positions of each curve in catalog_info, keyed by id.
+        """
+        return self._row_positions("catalog_info")
+
+    def _row_positions(self, attr, **kwargs):
+        """
+        Group the rows of a frame by id once, so each curve is a single take rather than a scan.
+        """
+        key = ("row_positions", attr)
+        if key not in self._cache:
+            self._cache[key] = getattr(self, attr).groupby(self.id_col, **kwargs).indices
+        return self._cache[key]
+
+    def _refresh_cache(self):
+        """
+        Drop the cached row positions and masks if the data or catalog info has been replaced, or the
+        columns they are derived from edited in place. Hashing the columns is linear in the number of
+        rows, so it is done once per public method call.
+        """
+        columns = [("data", col) for col in [self.id_col, "mag_err", "quality", "phot_filter"]]
+        columns.append(("catalog_info", self.id_col))
+        fingerprint = tuple(
+            (attr, col, *_column_fingerprint(getattr(self, attr)[col]))
+            for attr, col in columns
+            if col in getattr(self, attr).columns
+        )
+        if self._cached_fingerprint != fingerprint:
+            self._cache = {}
+            self._cached_fingerprint = fingerprint
+
     def __len__(self):
         return len(self.catalog_info)
 
@@ -75,23 +146,15 @@ class LightCurveCollection(object):
         """
 
         # Filter preferences for this function call only
-        data = self.data
-        if not include_non_det:
-            data = data[data["mag_err"] < 99]
-        if not include_poor_images:
-            data = data[data["quality"] == "G"]
-
-        # Filter by filter
-        if phot_filter == "g":
-            data = data[data["phot_filter"] == "g"]
-        elif phot_filter == "V":
-            data = data[data["phot_filter"] == "V"]
-        elif phot_filter == "all":
-            pass
-        else:
-            raise ValueError("phot_filter must be in ['g', 'V', 'all']")
+        self._refresh_cache()
+        data = self._filter(include_non_det, include_poor_images, phot_filter)
+
+        result = data.groupby(self.id_col, observed=True).agg({col: func})
 
-        return data.groupby(self.id_col).agg({col: func})
+        # Index by the id values, as stats does, rather than by their categories
+        if isinstance(result.index, pd.CategoricalIndex):
+            result.index = result.index.astype(result.index.categories.dtype)
+        return result
 
     def stats(
         self, include_non_det=False, include_poor_images=False, phot_filter="all"
@@ -106,81 +169,239 @@ class LightCurveCollection(object):
         :return: pandas Dataframe with results
         """
         # Filter preferences for this function call only
-        data = self.data
-        if not include_non_det:
-            data = data[data["mag_err"] < 99]
-        if not include_poor_images:
-            data = data[data["quality"] == "G"]
-
-        # Filter by filter
-        if phot_filter == "g":
-            data = data[data["phot_filter"] == "g"]
-        elif phot_filter == "V":
-            data = data[data["phot_filter"] == "V"]
-        elif phot_filter == "all":
-            pass
-        else:
-            raise ValueError("phot_filter must be in ['g', 'V', 'all']")
+        self._refresh_cache()
+        mask = self._mask(include_non_det, include_poor_images, phot_filter)
+
+        # Categorical ids can be reduced directly over their integer codes. Masked magnitudes
+        # are skipped like nulls, so filtering and reducing share one pass over two columns.
+        if isinstance(self.data[self.id_col].dtype, pd.CategoricalDtype):
+            return _categorical_stats(self.data[self.id_col], self.data["mag"].where(mask))
 
-        return data.groupby(self.id_col).agg(
+        data = self.data[mask]
+        return data.groupby(self.id_col, observed=True).agg(
             mean_mag=("mag", "mean"), std_mag=("mag", "std"), epochs=("mag", "count")
         )
 
+    def batch_lomb_scargle(
+        self,
+        minimum_frequency=0.001,
+        maximum_frequency=25,
+        n_frequencies=100000,
+        fit_mean=True,
+        center_data=True,
+        normalization="standard",
+        include_non_det=False,
+        include_poor_images=False,
+        phot_filter="all",
+    ):
+        """
+        Compute Lomb-Scargle periodograms for every light curve in the collection on a shared frequency grid.
+        Uses the NUFFT implementation from nifty-ls, running on the GPU (cufinufft) when nifty-ls has CUDA support
+        and a CUDA device is available, and on the CPU (finufft) otherwise. Requires nifty-ls to be installed.
+
+        :param minimum_frequency: lowest frequency of the grid
+        :param maximum_frequency: highest frequency of the grid (inclusive)
+        :param n_frequencies: number of frequencies in the grid
+        :param fit_mean: if True, include a constant offset as part of the model at each frequency
+        :param center_data: if True, pre-center the data by subtracting the mean of the input data
+        :param normalization: normalization to use for the periodogram ['standard', 'model', 'log', 'psd']
+        :param include_non_det: whether or not to include non-detection events in analysis; defaults to False
+        :param include_poor_images: whether or not to include images of poor or unknown quality; defaults to False
+        :param phot_filter: specify bandpass filter for photometry, either g, V, or all, defaults to all
+        :return: frequency grid, power array of shape (n_curves, n_frequencies) and the id of each row
+        """
+        try:
+            import nifty_ls
+        except ImportError:
+            raise ImportError("batch_lomb_scargle requires nifty-ls (pip install nifty-ls)")
+
+        # A visible GPU is not enough: nifty-ls must also have been built with its CUDA backend
+        cuda = "cufinufft" in nifty_ls.core.AVAILABLE_BACKENDS and _has_cuda_device()
+        backend = "cufinufft" if cuda else "finufft"
+
+        # Filter preferences for this function call only
+        self._refresh_cache()
+        data = self._filter(include_non_det, include_poor_images, phot_filter)
+
+        # Row positions of each curve, without materializing per-curve frames
+        groups = data.groupby(self.id_col, observed=True).indices
+        jd = data["jd"].to_numpy(dtype=np.float64)
+        mag = data["mag"].to_numpy(dtype=np.float64)
+
+        # nifty-ls only batches series sharing the same times, so each curve gets its own transform
+        power = np.empty((len(groups), n_frequencies))
+        for row, idx in enumerate(groups.values()):
+            power[row] = nifty_ls.lombscargle(
+                jd[idx],
+                mag[idx],
+                fmin=minimum_frequency,
+                fmax=maximum_frequency,
+                Nf=n_frequencies,
+                fit_mean=fit_mean,
+                center_data=center_data,
+                normalization=normalization,
+                backend=backend,
+            ).power
+
+        frequency = np.linspace(minimum_frequency, maximum_frequency, n_frequencies)
+        return frequency, power, np.array(list(groups.keys()))
+
+    def _filter(self, include_non_det, include_poor_images, phot_filter):
+        """
+        Apply the filter preferences to the collection data.
+        """
+        return self.data[self._mask(include_non_det, include_poor_images, phot_filter)]
+
+    def _mask(self, include_non_det, include_poor_images, phot_filter):
+        """
+        Boolean mask of the rows passing the filter preferences.
+        Masks are cached per combination of preferences, so repeated analyses do not rescan the data.
+        """
+        if phot_filter not in ["g", "V", "all"]:
+            raise ValueError("phot_filter must be in ['g', 'V', 'all']")
+
+        key = ("mask", include_non_det, include_poor_images, phot_filter)
+        if key not in self._cache:
+            mask = np.ones(len(self.data), dtype=bool)
+            if not include_non_det:
+                mask &= (self.data["mag_err"] < 99).to_numpy()
+            # Without image quality information every epoch counts as good
+            if not include_poor_images and "quality" in self.data.columns:
+                mask &= (self.data["quality"] == "G").to_numpy()
+            if phot_filter != "all":
+                mask &= (self.data["phot_filter"] == phot_filter).to_numpy()
+            self._cache[key] = mask
+
+        return self._cache[key]
+
     def itercurves(self):
         """
         Generator to iterate through all light curves in the collection.
         :return: a generator that iterates over the collection
         """
-        for key, data in self.data.groupby(self.id_col):
-            source = self.catalog_info[self.id_col] == key
-            meta = self.catalog_info[source]
-            yield LightCurve(data, meta)
+        self._refresh_cache()
+        for key, idx in self._groups.items():
+            yield self._curve(key, idx)
 
-    def save(self, save_dir, file_format="parquet", include_index=True):
+    def save(self, save_dir, file_format="parquet", include_index=True, threads=1):
         """
         Saves entire light curve collection to a given directory.
 
         :param save_dir: directory name
         :param file_format: file format of saved objects ['parquet', 'csv', 'pickle']
         :param include_index: whether or not to save index (catalog_info)
+        :param threads: number of threads writing light curve files concurrently
         :return: a list of file names
         """
+        if type(threads) is not int:
+            raise ValueError("'threads' must be integer value")
+
+        self._refresh_cache()
+
         filenames = []
         if file_format == "parquet":
+            ext = "parq"
             if include_index:
                 self.catalog_info.to_parquet(os.path.join(save_dir, "index.parq"))
                 filenames.append("index.parq")
-            for lc in self.itercurves():
-                file = os.path.join(save_dir, f"{lc.meta[self.id_col].values[0]}.parq")
-                lc.save(file, file_format="parquet")
-                filenames.append(file)
 
         elif file_format == "pickle":
+            ext = "pkl"
             if include_index:
                 self.catalog_info.to_pickle(os.path.join(save_dir, "index.pkl"))
                 filenames.append("index.pkl")
-            for lc in self.itercurves():
-                file = os.path.join(save_dir, f"{lc.meta[self.id_col].values[0]}.pkl")
-                lc.save(file, file_format="pickle")
-                filenames.append(file)
 
         elif file_format == "csv":
+            ext = "csv"
             if include_index:
                 self.catalog_info.to_csv(
                     os.path.join(save_dir, "index.csv"), index=False
                 )
                 filenames.append("index.csv")
-            for lc in self.itercurves():
-                file = os.path.join(save_dir, f"{lc.meta[self.id_col].values[0]}.csv")
-                lc.save(file, file_format="csv")
-                filenames.append(file)
         else:
             raise ValueError(
                 f"invalid format: '{file_format}' not in ['parquet', 'csv', 'pickle']"
             )
 
+        # Files are named by the keys of the precomputed row index, so curves missing
+        # from catalog_info are saved too
+        def save_curve(key):
+            file = os.path.join(save_dir, f"{key}.{ext}")
+            self.__get_lc(key).save(file, file_format=file_format)
+            return file
+
+        # Writing is mostly I/O and compression, which release the GIL
+        with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+            filenames.extend(pool.map(save_curve, self._groups))
+
         return filenames
 
+    def save_parquet(self, path):
+        """
+        Saves entire light curve collection as a single Parquet dataset, Hive-partitioned by id.
+        The catalog info is stored alongside as _meta.parquet.
+
+        :param path: directory of the dataset
+        :return: void
+        """
+        os.makedirs(path, exist_ok=True)
+        self._refresh_cache()
+
+        # Record the id column so the collection can be rebuilt without guessing
+        meta = pa.Table.from_pandas(self.catalog_info, preserve_index=False)
+        meta = meta.replace_schema_metadata(
+            {**meta.schema.metadata, b"id_col": self.id_col.encode()}
+        )
+        pq.write_table(meta, os.path.join(path, "_meta.parquet"), compression="zstd")
+
+        table = pa.Table.from_pandas(self.data, preserve_index=False)
+        partitioning = ds.partitioning(
+            pa.schema([table.schema.field(self.id_col)]), flavor="hive"
+        )
+        ds.write_dataset(
+            table,
+            base_dir=path,
+            format="parquet",
+            partitioning=partitioning,
+            existing_data_behavior="overwrite_or_ignore",
+            max_partitions=max(1024, len(self._groups)),
+            file_options=ds.ParquetFileFormat().make_write_options(
+                compression="zstd", compression_level=3
+            ),
+        )
+
+    @classmethod
+    def read_parquet(cls, path, columns=None, filters=None):
+        """
+        Loads a light curve collection saved with save_parquet.
+
+        :param path: directory of the dataset
+        :param columns: columns of the light curves to load; defaults to all
+        :param filters: row filters pushed down to pyarrow, either an expression or a list of tuples
+                        such as [("asas_sn_id", "in", [...]), ("mag_err", "<", 99)]
+        :return: LightCurveCollection
+        """
+        meta = pq.read_table(os.path.join(path, "_meta.parquet"))
+        catalog_info = meta.to_pandas()
+        id_col = meta.schema.metadata[b"id_col"].decode()
+
+        # The ids and cameras are needed to rebuild the collection
+        if columns is not None:
+            columns = list(dict.fromkeys([id_col, "camera", *columns]))
+
+        # Read the partition keys back with the type they had in the catalog
+        partitioning = ds.partitioning(
+            pa.schema([meta.schema.field(id_col)]), flavor="hive"
+        )
+        data = pq.read_table(
+            path, columns=columns, filters=filters, partitioning=partitioning
+        ).to_pandas()
+
+        if filters is not None:
+            catalog_info = catalog_info[catalog_info[id_col].isin(pd.Index(data[id_col]))]
+
+        return cls(data, catalog_info, id_col)
+
     def merge(self, name):
         """
         Merge a LightCurveCollection or list of LightCurves to a single object.
@@ -192,3 +413,52 @@ class LightCurveCollection(object):
         lcs_data = [lc.data for lc in self.itercurves()]
 
         return LightCurve(data=pd.concat(lcs_data), meta=pd.DataFrame({"name": [name]}))
+
+
+def _has_cuda_device():
+    """
+    Check for a usable CUDA device through cupy.
+    """
+    try:
+        import cupy
+
+        return cupy.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        return False
+
+
+def _categorical_stats(ids, mag):
+    """
+    Mean, standard deviation and count of magnitudes per id, computed with one sorted
+    pass over the categorical codes instead of a pandas groupby.
+
+    :param ids: categorical Series of light curve ids
+    :param mag: Series of magnitudes aligned with ids
+    :return: pandas Dataframe with results, indexed by id
+    """
+    codes = ids.cat.codes.to_numpy()
+    mag = mag.to_numpy(dtype=np.float64)
+
+    # Skip null ids and magnitudes, as groupby would
+    valid = (codes >= 0) & ~np.isnan(mag)
+    codes = codes[valid]
+    mag = mag[valid]
+
+    # Sort by code so every curve occupies one contiguous run; collections are already sorted by id
+    if np.any(codes[1:] < codes[:-1]):
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        mag = mag[order]
+
+    starts = np.flatnonzero(np.diff(codes, prepend=-1))
+    counts = np.diff(np.append(starts, len(codes)))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.add.reduceat(mag, starts) / counts if len(starts) else mag
+        # Sum squared residuals about each mean, rather than E[x^2] - E[x]^2, for stability
+        resid = mag - np.repeat(mean, counts)
+        sum_sq = np.add.reduceat(resid * resid, starts) if len(starts) else mag
+        std = np.sqrt(sum_sq / (counts - 1))
+
+    index = pd.Index(ids.cat.categories.take(codes[starts]), name=ids.name)
+    return pd.DataFrame({"mean_mag": mean, "std_mag": std, "epochs": counts}, index=index)
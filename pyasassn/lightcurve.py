@@ -1,12 +1,31 @@
 from __future__ import division, print_function
 import os
+from collections import OrderedDict
+from functools import lru_cache
 from astropy.timeseries import LombScargle
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 
 from .wavelet import LS_wavelet
-from .utils import Vcams, gcams
+from .utils import Vcams, gcams, _column_fingerprint, _ls_power
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Curves with fewer epochs than this use the compiled direct sums when method='auto' and nifty-ls is unavailable
+_NUMBA_MAX_EPOCHS = 300
+
+# Columns the cached values of a LightCurve are derived from
+_ANALYSED_COLUMNS = ["jd", "mag", "mag_err", "quality", "phot_filter"]
+
+# Number of lomb_scargle results kept per light curve, least recently used first out
+_MAX_CACHED_PERIODOGRAMS = 8
 
 
 class LightCurve:
@@ -19,9 +38,23 @@ class LightCurve:
         self.data = data.sort_values("jd").reset_index(
             drop=True
         )  # Ensure times are sorted
+
+        # Categorical labels make the filter selections integer comparisons
+        for col in ["phot_filter", "quality"]:
+            if col in self.data.columns:
+                self.data[col] = self.data[col].astype("category")
+
         self.meta = meta
         self.epochs = len(data)
 
+        # Phase plot of the last find_period call, refolded in place by update_phase
+        self._fig, self._scatters = None, {}
+
+        # Values derived from the data (filter selections, partial periodogram sums). Each public
+        # method checks once that the data is unchanged, and the helpers it calls trust the cache.
+        self._cache = {}
+        self._cached_fingerprint = None
+
     def __repr__(self):
         # f = f"LightCurve of ASAS-SN {self.meta.asas_sn_id[0]} with {self.epochs} epochs \n"
         return self.data.__repr__()
@@ -42,6 +75,39 @@ class LightCurve:
     def time(self):
         return self.data.jd
 
+    # Contiguous float64 columns for the numerical methods, built once per data frame
+
+    @property
+    def _jd(self):
+        return self._cached("jd", lambda: self._column_array("jd"))
+
+    @property
+    def _mag(self):
+        return self._cached("mag", lambda: self._column_array("mag"))
+
+    @property
+    def _mag_err(self):
+        return self._cached("mag_err", lambda: self._column_array("mag_err"))
+
+    def _column_array(self, col):
+        return np.ascontiguousarray(self.data[col].to_numpy(), dtype=np.float64)
+
+    # Boolean masks of the filter preferences shared by every selection
+
+    @property
+    def _det_mask(self):
+        return self._cached("det_mask", lambda: self._mag_err < 99)
+
+    @property
+    def _quality_mask(self):
+        # Without image quality information every epoch counts as good
+        def quality():
+            if "quality" not in self.data.columns:
+                return np.ones(len(self.data), dtype=bool)
+            return (self.data["quality"] == "G").to_numpy()
+
+        return self._cached("quality_mask", quality)
+
     @staticmethod
     def _validate(obj):
         # verify there is a column latitude and a column longitude
@@ -60,13 +126,40 @@ class LightCurve:
         :return: void
         """
         if file_format == "parquet":
-            self.data.to_parquet(filename)
+            # Only store the labels this curve uses, not those of the collection it came from
+            data = self.data.copy(deep=False)
+            for col in data.select_dtypes("category").columns:
+                data[col] = data[col].cat.remove_unused_categories()
+
+            # Record that rows are sorted by time, so readers can skip row groups on time filters
+            table = pa.Table.from_pandas(data)
+            table = table.replace_schema_metadata({**table.schema.metadata, b"sorted_by": b"jd"})
+            pq.write_table(
+                table,
+                filename,
+                compression="zstd",
+                compression_level=3,
+                row_group_size=65536,
+                sorting_columns=[pq.SortingColumn(table.schema.get_field_index("jd"))],
+            )
         elif file_format == "pickle":
             self.data.to_pickle(filename)
         elif file_format == "csv":
-            with open(filename, "w+") as f:
-                f.write(f"# {self.meta.to_json(orient='records')[2:-2]}\n")
-            self.data.to_csv(filename, mode="a", index=False)
+            # pyarrow formats the columns in C++; categorical columns are written as their labels
+            table = pa.Table.from_pandas(self.data, preserve_index=False)
+            table = table.cast(
+                pa.schema(
+                    [
+                        pa.field(field.name, field.type.value_type)
+                        if pa.types.is_dictionary(field.type)
+                        else field
+                        for field in table.schema
+                    ]
+                )
+            )
+            with open(filename, "wb") as f:
+                f.write(f"# {self.meta.to_json(orient='records')[2:-2]}\n".encode())
+                pacsv.write_csv(table, f)
         else:
             raise ValueError(
                 f"invalid format: '{file_format}' not in ['parquet', 'csv', 'pickle']"
@@ -92,62 +185,51 @@ class LightCurve:
         :param include_non_det: whether or not to include non-detection events in analysis; defaults to False
         :return: void
         """
-        # Filter preferences
-        data = self.data
-
-        # Filter out pool quality images
-        if not include_poor_images:
-            data = data[data["quality"] == "G"]
+        if phot_filter not in ["g", "V", "all"]:
+            raise ValueError("phot_filter must be in ['g', 'V', 'all']")
 
-        # Filter detections
-        errors = data.mag_err > 99
-        detections = data[~errors]
+        self._refresh_cache()
 
         # Plot
-        plt.figure(figsize=figsize)
+        fig, ax = plt.subplots(figsize=figsize)
 
         # Set font size
         plt.rcParams.update({"font.size": font_size})
-        # Diff colors for filters
-        if phot_filter in ["g", "all"]:
-            plt.errorbar(
-                x=detections[detections["phot_filter"] == "g"].jd - 2450000,
-                y=detections[detections["phot_filter"] == "g"].mag,
-                yerr=detections[detections["phot_filter"] == "g"].mag_err,
-                fmt="o",
-                c="mediumblue",
-                label="g band",
-            )
-        if phot_filter in ["V", "all"]:
-            plt.errorbar(
-                x=detections[detections["phot_filter"] == "V"].jd - 2450000,
-                y=detections[detections["phot_filter"] == "V"].mag,
-                yerr=detections[detections["phot_filter"] == "V"].mag_err,
-                fmt="o",
-                c="teal",
-                label="V band",
-            )
-        if phot_filter not in ["g", "V", "all"]:
-            raise ValueError("phot_filter must be in ['g', 'V', 'all']")
+        # Diff colors for filters. Epochs come from the cached selections (filtering out poor
+        # quality images), split into detections and non-detections by mag_err.
+        for band, color in [("g", "mediumblue"), ("V", "teal")]:
+            if phot_filter in [band, "all"]:
+                positions = self._select(include_poor_images, True, band)
+                positions = positions[~(self._mag_err[positions] > 99)]
+                ax.errorbar(
+                    x=self._jd[positions] - 2450000,
+                    y=self._mag[positions],
+                    yerr=self._mag_err[positions],
+                    fmt="o",
+                    c=color,
+                    label=f"{band} band",
+                )
 
         # Plot non-detections
         if include_non_det:
-            plt.errorbar(
-                x=data[errors].jd - 2450000,
-                y=data[errors].mag,
+            positions = self._select(include_poor_images, True, "all")
+            positions = positions[self._mag_err[positions] > 99]
+            ax.errorbar(
+                x=self._jd[positions] - 2450000,
+                y=self._mag[positions],
                 fmt="v",
                 c="red",
                 label="non-detections",
             )
         # Label plots
         self._label_plots(font_size)
-        plt.legend()
-        plt.xlabel("Date (JD-2450000)")
-        plt.ylabel("Magnitude")
-        plt.gca().invert_yaxis()
+        ax.legend()
+        ax.set_xlabel("Date (JD-2450000)")
+        ax.set_ylabel("Magnitude")
+        ax.invert_yaxis()
 
         if save_file:
-            plt.savefig(save_file)
+            fig.savefig(save_file)
         else:
             plt.show()
 
@@ -185,7 +267,13 @@ class LightCurve:
         :param maximum_frequency: If specified, then use this maximum frequency rather than one chosen based on the average nyquist frequency.
         :param method: specify the lomb scargle implementation to use. Options are:
 
-            -  ‘auto’: choose the best method based on the input
+            -  ‘auto’: for nterms = 1, use ‘fastnifty’ if nifty-ls is installed, or ‘numba’ on short light curves if numba is installed; otherwise choose the best method based on the input
+
+            -  ‘fastnifty’: use the O[N log N] NUFFT implementation from nifty-ls. Requires nifty-ls to be installed.
+
+            -  ‘numba’: use the O[N^2] direct sums compiled with numba. Faster than ‘cython’, but only worthwhile for short light curves; requires numba to be installed.
+
+            -  ‘fft’: use ‘fastnifty’ if nifty-ls is installed, otherwise an approximate O[N log N] pure-NumPy FFT of the data spread onto a uniform time grid.
 
             -  ‘fast’: use the O[N log N] fast method. Note that this requires evenly-spaced frequencies: by default this will be checked unless assume_regular_frequency is set to True.
 
@@ -210,40 +298,31 @@ class LightCurve:
         :param include_non_det: whether or not to include non-detection events in analysis; defaults to False
         :return: power, frequency and the astropy LombScargle object
         """
-        # Filter preferences for this function call only
-        data = self.data
-        if not include_non_det:
-            data = data[data["mag_err"] < 99]
-        if not include_poor_images:
-            data = data[data["quality"] == "G"]
-
-        # Filter by filter
-        if phot_filter == "g":
-            data = data[data["phot_filter"] == "g"]
-        elif phot_filter == "V":
-            data = data[data["phot_filter"] == "V"]
-        elif phot_filter == "all":
-            pass
-        else:
-            raise ValueError("phot_filter must be in ['g', 'V', 'all']")
-
-        ls = LombScargle(
-            data.jd,
-            data.mag,
-            fit_mean=fit_mean,
-            center_data=center_data,
-            nterms=nterms,
-            normalization=normalization,
+        # Periodograms are cached per combination of parameters, so repeated calls only redo the plot
+        params = (
+            fit_mean,
+            center_data,
+            nterms,
+            normalization,
+            minimum_frequency,
+            maximum_frequency,
+            method,
+            samples_per_peak,
+            nyquist_factor,
+            include_poor_images,
+            include_non_det,
+            phot_filter,
         )
+        self._refresh_cache()
+        periodograms = self._cached("lomb_scargle", OrderedDict)
+        if params in periodograms:
+            periodograms.move_to_end(params)
+        else:
+            periodograms[params] = self._periodogram(*params)
+            if len(periodograms) > _MAX_CACHED_PERIODOGRAMS:
+                periodograms.popitem(last=False)
+        frequency, power, ls = periodograms[params]
 
-        frequency, power = ls.autopower(
-            minimum_frequency=minimum_frequency,
-            maximum_frequency=maximum_frequency,
-            method=method,
-            samples_per_peak=samples_per_peak,
-            nyquist_factor=nyquist_factor,
-            normalization=normalization,
-        )
         if plot:
             plt.figure(figsize=figsize)
             # Set font size
@@ -262,6 +341,85 @@ class LightCurve:
             # Reset font size (default = 10)
             plt.rcParams.update({"font.size": 10})
 
+        # The cached arrays stay read-only; callers get their own copies
+        return frequency.copy(), power.copy(), ls
+
+    def _periodogram(
+        self,
+        fit_mean,
+        center_data,
+        nterms,
+        normalization,
+        minimum_frequency,
+        maximum_frequency,
+        method,
+        samples_per_peak,
+        nyquist_factor,
+        include_poor_images,
+        include_non_det,
+        phot_filter,
+    ):
+        """
+        Frequency grid, power and LombScargle object for lomb_scargle. The power is returned
+        read-only, as it is cached and shared between calls.
+        """
+        # Filter preferences for this function call only
+        positions = self._select(include_poor_images, include_non_det, phot_filter)
+
+        # Prefer the NUFFT of nifty-ls, then the compiled direct sums for short curves
+        if method == "auto" and nterms == 1:
+            if _has_nifty_ls():
+                method = "fastnifty"
+            elif numba is not None and len(positions) < _NUMBA_MAX_EPOCHS:
+                method = "numba"
+        # The NumPy FFT path is only a fallback for when nifty-ls is missing
+        if method == "fft" and _has_nifty_ls():
+            method = "fastnifty"
+        if method == "fastnifty" and not _has_nifty_ls():
+            raise ImportError("method 'fastnifty' requires nifty-ls (pip install nifty-ls)")
+        if method == "numba":
+            if numba is None:
+                raise ImportError("method 'numba' requires numba (pip install numba)")
+            if nterms != 1:
+                raise ValueError("method 'numba' only supports nterms = 1")
+        if method == "fft" and nterms != 1:
+            raise ValueError("method 'fft' only supports nterms = 1")
+
+        jd = self._jd[positions]
+        mag = self._mag[positions]
+
+        ls = LombScargle(
+            jd,
+            mag,
+            fit_mean=fit_mean,
+            center_data=center_data,
+            nterms=nterms,
+            normalization=normalization,
+        )
+
+        # Same grid as astropy's autofrequency, shared between calls with the same bounds
+        baseline = jd[-1] - jd[0]
+        if minimum_frequency is None:
+            minimum_frequency = 0.5 / (samples_per_peak * baseline)
+        if maximum_frequency is None:
+            maximum_frequency = nyquist_factor * 0.5 * len(jd) / baseline
+        frequency = _frequency_grid(baseline, minimum_frequency, maximum_frequency, samples_per_peak)
+
+        if method in ["numba", "fft"]:
+            if method == "numba":
+                sums = self._ls_partial_sums(frequency, include_poor_images, include_non_det, phot_filter)
+            else:
+                sums = _ls_fft_sums(frequency, jd, mag)
+            power = _ls_power(*sums, fit_mean, center_data, normalization)
+        else:
+            power = ls.power(
+                frequency,
+                method=method,
+                assume_regular_frequency=True,
+                normalization=normalization,
+            )
+        power.setflags(write=False)
+
         return frequency, power, ls
 
     def wavelet_power(
@@ -272,6 +430,7 @@ class LightCurve:
         include_non_det=True,
         phot_filter="all",
         tradeoff=2,
+        backend="auto",
         plot=True,
         font_size=10,
         **kwargs
@@ -285,6 +444,7 @@ class LightCurve:
         :param phot_filter: specify bandpass filter for photometry, either g, V, or all, defaults to g
         :param include_non_det: whether or not to include non-detection events in analysis; defaults to False
         :tradeoff: Tradeoff parameter between frequency and time resolution
+        :backend: 'numpy', 'numba', 'cupy' or 'auto' (numba if installed); see LS_wavelet
         :plot: Construct figure
         :**kwargs: Keyword arguments to pass to plt.imshow()
 
@@ -292,27 +452,13 @@ class LightCurve:
         """
 
         # Filter preferences for this function call only
-        data = self.data
-
-        if not include_non_det:
-            data = data[data["mag_err"] < 99]
-        if not include_poor_images:
-            data = data[data["quality"] == "G"]
-
-        # Filter by filter
-        if phot_filter == "g":
-            data = data[data["phot_filter"] == "g"]
-        elif phot_filter == "V":
-            data = data[data["phot_filter"] == "V"]
-        elif phot_filter == "all":
-            pass
-        else:
-            raise ValueError("phot_filter must be in ['g', 'V', 'all']")
+        self._refresh_cache()
+        positions = self._select(include_poor_images, include_non_det, phot_filter)
 
         # Data for wavelet
-        x = data.jd
-        y = data.mag
-        e_y = data.mag_err
+        x = self._jd[positions]
+        y = self._mag[positions]
+        e_y = self._mag_err[positions]
 
         if tt is None:
             tt = np.linspace(np.min(x), np.max(x), 800)
@@ -320,7 +466,7 @@ class LightCurve:
         if ff is None:
             ff = np.linspace(1/(np.max(x) - np.min(x))/2, 1/np.min(np.diff(x))/2, 600)
 
-        wavelet = LS_wavelet(tt, ff, x, y, e_y, Γ=tradeoff)
+        wavelet = LS_wavelet(tt, ff, x, y, e_y, Γ=tradeoff, backend=backend)
         if plot:
             plt.imshow(wavelet.T, origin='lower', aspect='auto',
                        extent=(np.min(tt), np.max(tt), np.min(ff), np.max(ff)), **kwargs)
@@ -360,13 +506,6 @@ class LightCurve:
         :param phot_filter: specify bandpass filter for photometry, either g, V, or all, defaults to all
         :return: period of the light curve
         """
-        # Filter preferences for this function call only
-        data = self.data
-        if not include_non_det:
-            data = data[data["mag_err"] < 99]
-        if not include_poor_images:
-            data = data[data["quality"] == "G"]
-
         # Get frequency
         if best_frequency is None:
             best_frequency = frequency[np.argmax(power)]
@@ -375,45 +514,36 @@ class LightCurve:
         period = 1 / best_frequency
 
         if plot:
-            plt.figure(figsize=figsize)
+            self._refresh_cache()
+            self._fig, self._scatters = plt.figure(figsize=figsize), {}
             # Set font size
             plt.rcParams.update({"font.size": font_size})
 
             if phot_filter in ["g", "all"]:
-                # Filter for filter
-                plot_data = data[data["phot_filter"] == "g"]
+                # Filter preferences for this function call only
+                positions = self._select(include_poor_images, include_non_det, "g")
+                jd = self._jd[positions]
+                mag = self._mag[positions]
 
                 # Get reference epoch for phasing
-                if reference_epoch == "max":
-                    ref_epoch = plot_data["jd"][plot_data.mag.idxmin()]
-                elif reference_epoch == "min":
-                    ref_epoch = plot_data["jd"][plot_data.mag.idxmax()]
-                else:
-                    ref_epoch = 0.0
-
-                phase = ((plot_data.jd - ref_epoch) / period) % 1
-                # Concatenate for multiple peaks
-                x = np.concatenate([phase, phase + 1])
-                y = np.concatenate([plot_data.mag, plot_data.mag])
-                plt.scatter(x, y, c="mediumblue", label="g band")
+                ref_epoch = _reference_epoch(jd, mag, reference_epoch)
+
+                x, y = _fold(jd, mag, ref_epoch, period)
+                scatter = plt.scatter(x, y, c="mediumblue", label="g band")
+                self._scatters["g"] = (scatter, jd, mag, ref_epoch)
 
             if phot_filter in ["V", "all"]:
-                # Filter for filter
-                plot_data = data[data["phot_filter"] == "V"]
+                # Filter preferences for this function call only
+                positions = self._select(include_poor_images, include_non_det, "V")
+                jd = self._jd[positions]
+                mag = self._mag[positions]
 
                 # Get reference epoch for phasing
-                if reference_epoch == "max":
-                    ref_epoch = plot_data["jd"][plot_data.mag.idxmax()]
-                elif reference_epoch == "min":
-                    ref_epoch = plot_data["jd"][plot_data.mag.idxmin()]
-                else:
-                    ref_epoch = 0.0
-
-                phase = ((plot_data.jd - ref_epoch) / period) % 1
-                # Concatenate for multiple peaks
-                x = np.concatenate([phase, phase + 1])
-                y = np.concatenate([plot_data.mag, plot_data.mag])
-                plt.scatter(x, y, c="teal", label="V band")
+                ref_epoch = _reference_epoch(jd, mag, reference_epoch)
+
+                x, y = _fold(jd, mag, ref_epoch, period)
+                scatter = plt.scatter(x, y, c="teal", label="V band")
+                self._scatters["V"] = (scatter, jd, mag, ref_epoch)
             if phot_filter not in ["g", "V", "all"]:
                 raise ValueError("phot_filter must be in ['g', 'V', 'all']")
 
@@ -432,17 +562,122 @@ class LightCurve:
 
         return period
 
+    def update_phase(self, period):
+        """
+        Refold the phase plot of the last find_period call on a new period, reusing its figure.
+        Useful for tuning the period interactively, e.g. from a slider.
+
+        :param period: period to fold the light curve on
+        :return: void
+        """
+        if self._fig is None:
+            raise ValueError("no phase plot to update, call find_period with plot=True first")
+
+        for scatter, jd, mag, ref_epoch in self._scatters.values():
+            x, y = _fold(jd, mag, ref_epoch, period)
+            scatter.set_offsets(np.column_stack([x, y]))
+        self._fig.canvas.draw_idle()
+
+    def _refresh_cache(self):
+        """
+        Drop every cached value if the data has been replaced or any of its analysed columns edited in place.
+        Hashing the columns is linear in the number of epochs, so it is done once per public method call.
+        """
+        fingerprint = tuple(
+            (col, *_column_fingerprint(self.data[col]))
+            for col in _ANALYSED_COLUMNS
+            if col in self.data.columns
+        )
+        if self._cached_fingerprint != fingerprint:
+            self._cache = {}
+            self._cached_fingerprint = fingerprint
+
+    def _cached(self, key, compute):
+        """
+        Memoize a value derived from the data. Callers refresh the cache first with _refresh_cache.
+        """
+        if key not in self._cache:
+            self._cache[key] = compute()
+
+        return self._cache[key]
+
+    def _select(self, include_poor_images, include_non_det, phot_filter):
+        """
+        Row positions of the epochs passing the filter preferences.
+        Positions are cached per combination of preferences, so repeated analyses do not rescan the data.
+        """
+        if phot_filter not in ["g", "V", "all"]:
+            raise ValueError("phot_filter must be in ['g', 'V', 'all']")
+
+        def select():
+            mask = np.ones(len(self.data), dtype=bool)
+            if not include_non_det:
+                mask &= self._det_mask
+            if not include_poor_images:
+                mask &= self._quality_mask
+            if phot_filter != "all":
+                mask &= (self.data["phot_filter"] == phot_filter).to_numpy()
+            return np.flatnonzero(mask)
+
+        return self._cached(("select", include_poor_images, include_non_det, phot_filter), select)
+
+    def _ls_partial_sums(self, frequency, include_poor_images, include_non_det, phot_filter):
+        """
+        Direct Lomb-Scargle sums of the selected epochs, as (trig sums, count, sum(y), sum(y^2)).
+
+        The sums are additive over epochs, so they are cached for each disjoint cell of epochs sharing
+        a detection flag, image quality and filter; every selection is a union of cells and reuses them
+        across calls on the same frequency grid.
+        """
+        # Epochs in a cell agree on every filter preference, so one member decides the whole cell
+        def cells():
+            keys = [self.data["mag_err"] < 99]
+            keys += [self.data[col] for col in ["quality", "phot_filter"] if col in self.data.columns]
+            return self.data.groupby(keys, sort=False, observed=True, dropna=False).indices
+
+        selected = np.zeros(len(self.data), dtype=bool)
+        selected[self._select(include_poor_images, include_non_det, phot_filter)] = True
+
+        # A common time reference keeps the sums of different cells in phase
+        omega = 2 * np.pi * frequency
+        t = self._jd - self._jd[0] if len(self._jd) else self._jd
+        y = self._mag
+
+        grid = (frequency[0], frequency[-1], len(frequency)) if len(frequency) else ()
+        sums, n, y_sum, y2_sum = np.zeros((len(frequency), 6)), 0, 0.0, 0.0
+        for cell, idx in self._cached("cells", cells).items():
+            if not selected[idx[0]]:
+                continue
+
+            # Only the latest frequency grid is kept for each cell
+            cached = self._cache.get(("ls_sums", cell))
+            if cached is None or cached[0] != grid:
+                t_cell = np.ascontiguousarray(t[idx])
+                y_cell = np.ascontiguousarray(y[idx])
+                cached = (grid, _ls_sums(omega, t_cell, y_cell), len(idx), y_cell.sum(), np.dot(y_cell, y_cell))
+                self._cache[("ls_sums", cell)] = cached
+
+            sums += cached[1]
+            n += cached[2]
+            y_sum += cached[3]
+            y2_sum += cached[4]
+
+        return sums, n, y_sum, y2_sum
+
     def _label_plots(self, font_size):
+        # Read the catalog row once, keeping the type of each column; curves without one get no ids
+        row = next(iter(self.meta.head(1).to_dict("records")), {})
+
         suptitle = ""
         title = ""
-        if "asas_sn_id" in self.meta.columns:
-            suptitle += f"SkyPatrol ID: {self.meta.asas_sn_id.item()}"
-        if "name" in self.meta.columns:
-            suptitle += f"\nSource Name: {self.meta.name.item()}"
-        if "ra_deg" in self.meta.columns:
-            title += f"Right Ascention: {self.meta.ra_deg.item():.05f}"
-        if "dec_deg" in self.meta.columns:
-            title += f"\nDeclination: {self.meta.dec_deg.item():.05f}"
+        if "asas_sn_id" in row:
+            suptitle += f"SkyPatrol ID: {row['asas_sn_id']}"
+        if "name" in row:
+            suptitle += f"\nSource Name: {row['name']}"
+        if "ra_deg" in row:
+            title += f"Right Ascention: {row['ra_deg']:.05f}"
+        if "dec_deg" in row:
+            title += f"\nDeclination: {row['dec_deg']:.05f}"
 
         title += f"\nEpochs: {self.epochs}"
         plt.title(title, loc="left", fontsize=font_size - 2)
@@ -457,21 +692,164 @@ class LightCurve:
             raise ValueError("col must be in ['mag', 'flux']")
 
         if method == "median":
-            data_norm = []
-            for camera in data.camera.unique():
-                lcx = data[data.camera == camera].copy()
-                lcx[col] /= lcx[col].median()
-                data_norm.append(lcx)
-            return LightCurve(pd.concat(data_norm), self.meta)
+            # Divide by the median of each camera in one grouped pass
+            data[col] = data[col] / data.groupby("camera", sort=False)[col].transform("median")
+            return LightCurve(data, self.meta)
         elif method == "gp":
             pass
 
     def quality_cut(self, sigma_cut=5):
-        # Quality cuts
-        m = self.flux_err < sigma_cut * np.median(self.flux_err)
-        m &= self["flux"] != 99.99
-        m &= self["flux"] > 0
-        m &= self.mag != "99.990"
-        m &= self.mag_err < 99
+        # Quality cuts, combined in place on contiguous arrays with one scratch buffer
+        flux = self._column_array("flux")
+        flux_err = self._column_array("flux_err")
+        m = flux_err < sigma_cut * np.median(flux_err)
+        cond = np.empty_like(m)
+        m &= np.not_equal(flux, 99.99, out=cond)
+        m &= np.greater(flux, 0, out=cond)
+        self._refresh_cache()
+        m &= self._det_mask
+
+        # Magnitudes read as text carry the non-detection sentinel as a string
+        if not pd.api.types.is_numeric_dtype(self.data["mag"]):
+            m &= (self.data["mag"] != "99.990").to_numpy()
 
         return LightCurve(self.data[m].copy(), self.meta)
+
+
+def _has_nifty_ls():
+    """
+    Check whether nifty-ls is installed. Importing it registers the 'fastnifty' method with astropy's LombScargle.
+    """
+    try:
+        import nifty_ls
+    except ImportError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=32)
+def _frequency_grid(baseline, minimum_frequency, maximum_frequency, samples_per_peak):
+    """
+    Evenly spaced frequencies resolving peaks of a light curve with the given baseline,
+    as astropy's LombScargle.autofrequency builds them.
+    The grid is cached and shared between calls, so it is returned read-only.
+    """
+    df = 1.0 / (samples_per_peak * baseline)
+    n_freq = 1 + int(np.round((maximum_frequency - minimum_frequency) / df))
+    frequency = minimum_frequency + df * np.arange(n_freq)
+    frequency.setflags(write=False)
+    return frequency
+
+
+def _reference_epoch(jd, mag, reference_epoch):
+    """
+    Time of maximum ('max') or minimum ('min') flux, i.e. of the smallest or largest magnitude.
+    NaN magnitudes are skipped; any other reference_epoch gives 0.
+    """
+    if reference_epoch == "max":
+        return jd[np.nanargmin(mag)]
+    elif reference_epoch == "min":
+        return jd[np.nanargmax(mag)]
+    return 0.0
+
+
+def _fold(jd, mag, ref_epoch, period):
+    """
+    Phase-fold epochs on a period, repeated over two cycles so peaks near phase 0 are not split.
+    """
+    # Fold into the first half of one preallocated buffer, then repeat it shifted for multiple peaks.
+    # np.mod rather than np.fmod keeps epochs before the reference epoch in [0, 1).
+    n = len(jd)
+    x = np.empty(2 * n)
+    phase = x[:n]
+    np.subtract(jd, ref_epoch, out=phase)
+    phase /= period
+    np.mod(phase, 1, out=phase)
+    np.add(phase, 1, out=x[n:])
+    y = np.tile(mag, 2)
+    return x, y
+
+
+def _ls_fft_sums(frequency, t, y, oversample=5):
+    """
+    Approximate Lomb-Scargle trig sums (as returned by _ls_sums) on an evenly spaced frequency grid.
+
+    Each epoch is spread onto a uniform time grid by linear interpolation, and the sums at every
+    frequency come from a single FFT per term, O[N log N] with NumPy only. The time grid spans one
+    period of the frequency step, so the spreading wraps around exactly; its triangular kernel is
+    divided out afterwards.
+
+    :param frequency: evenly spaced frequencies
+    :param t: times of the epochs
+    :param y: values of the epochs
+    :param oversample: grid points per frequency, before rounding up to a power of two
+    :return: trig sums, number of epochs, sum(y) and sum(y^2)
+    """
+    n_freq = len(frequency)
+    f0 = frequency[0]
+    df = (frequency[-1] - f0) / (n_freq - 1) if n_freq > 1 else 1.0
+
+    # The 2f terms need the grid to reach twice the highest frequency index
+    n_grid = 1 << int(np.ceil(np.log2(2 * oversample * n_freq)))
+
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    t = t - t[0]
+    position = (t * df * n_grid) % n_grid
+    left = np.floor(position).astype(np.intp)
+    frac = position - left
+    right = (left + 1) % n_grid
+    left %= n_grid
+
+    def transform(weights, shift, stride):
+        # Rotating by the lowest frequency first leaves exp(2 pi i k df t) for the FFT
+        h = weights * np.exp(2j * np.pi * shift * t)
+        grid = np.zeros(n_grid, dtype=np.complex128)
+        for idx, share in [(left, 1 - frac), (right, frac)]:
+            grid += np.bincount(idx, (h * share).real, n_grid)
+            grid += 1j * np.bincount(idx, (h * share).imag, n_grid)
+        k = np.arange(n_freq) * stride
+        return np.fft.ifft(grid)[k % n_grid] * n_grid / np.sinc(k / n_grid) ** 2
+
+    ones = np.ones_like(t)
+    s1 = transform(ones, f0, 1)
+    s2 = transform(ones, 2 * f0, 2)
+    sy = transform(y, f0, 1)
+
+    sums = np.stack([s1.real, s1.imag, s2.real, s2.imag, sy.real, sy.imag], axis=-1)
+    return sums, len(t), y.sum(), np.dot(y, y)
+
+
+if numba is not None:
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _ls_sums(omega, t, y):
+        """
+        Direct trig sums of the Lomb-Scargle periodogram at each angular frequency.
+        Columns are sum(cos), sum(sin), sum(cos 2wt), sum(sin 2wt), sum(y cos) and sum(y sin).
+        """
+        sums = np.empty((len(omega), 6))
+        for k in numba.prange(len(omega)):
+            c_sum = 0.0
+            s_sum = 0.0
+            c2_sum = 0.0
+            s2_sum = 0.0
+            yc_sum = 0.0
+            ys_sum = 0.0
+            for i in range(len(t)):
+                c = np.cos(omega[k] * t[i])
+                s = np.sin(omega[k] * t[i])
+                c_sum += c
+                s_sum += s
+                c2_sum += c * c - s * s
+                s2_sum += 2 * s * c
+                yc_sum += y[i] * c
+                ys_sum += y[i] * s
+            sums[k, 0] = c_sum
+            sums[k, 1] = s_sum
+            sums[k, 2] = c2_sum
+            sums[k, 3] = s2_sum
+            sums[k, 4] = yc_sum
+            sums[k, 5] = ys_sum
+        return sums
+
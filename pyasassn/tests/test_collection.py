@@ -0,0 +1,103 @@
+from __future__ import division, print_function
+
+import numpy as np
+import pandas as pd
+import pytest
+from astropy.timeseries import LombScargle
+
+from ..collection import LightCurveCollection
+
+
+def make_collection(n_curves=5, epochs=50, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.repeat(np.arange(n_curves), epochs)
+    data = pd.DataFrame(
+        {
+            "asas_sn_id": ids,
+            "jd": 2458000 + rng.random(len(ids)) * 1000,
+            "mag": 14 + rng.normal(0, 0.1, len(ids)),
+            "mag_err": np.where(rng.random(len(ids)) < 0.1, 99.99, 0.02),
+            "camera": rng.choice(["ba", "bA"], len(ids)),
+            "quality": rng.choice(["G", "B"], len(ids), p=[0.9, 0.1]),
+        }
+    )
+    catalog_info = pd.DataFrame(
+        {"asas_sn_id": np.arange(n_curves), "ra_deg": rng.random(n_curves)}
+    )
+    return LightCurveCollection(data, catalog_info, "asas_sn_id")
+
+
+def test_stats_categorical_ids():
+    lcs = make_collection()
+    assert isinstance(lcs.data["asas_sn_id"].dtype, pd.CategoricalDtype)
+
+    data = lcs.data[(lcs.data["mag_err"] < 99) & (lcs.data["quality"] == "G")]
+    expected = data.astype({"asas_sn_id": int}).groupby("asas_sn_id").agg(
+        mean_mag=("mag", "mean"), std_mag=("mag", "std"), epochs=("mag", "count")
+    )
+    pd.testing.assert_frame_equal(lcs.stats(), expected)
+
+
+def test_stats_follow_data_edits():
+    lcs = make_collection()
+    assert len(lcs.stats()) == 5
+
+    # Edits in place drop the cached filter masks
+    lcs.data["mag_err"] = 99.99
+    assert len(lcs.stats()) == 0
+
+
+def test_apply_function_index():
+    lcs = make_collection()
+    result = lcs.apply_function("median")
+
+    assert result.index.dtype == lcs.stats().index.dtype == np.int64
+    assert list(result.index) == list(range(5))
+
+
+@pytest.mark.parametrize("container", [list, tuple, set, np.array, pd.Series, pd.Index])
+def test_getitem_list(container):
+    lcs = make_collection()
+    subset = lcs[container([1, 3])]
+
+    assert isinstance(subset, LightCurveCollection)
+    assert list(subset.ids) == [1, 3]
+    assert set(subset.data["asas_sn_id"]) == {1, 3}
+
+
+def test_curve_ids_not_categorical():
+    lcs = make_collection()
+    for lc in [lcs[1], *lcs.itercurves()]:
+        assert lc.data["asas_sn_id"].dtype == np.int64
+
+
+def test_parquet_roundtrip(tmp_path):
+    lcs = make_collection()
+    lcs.save_parquet(tmp_path)
+
+    loaded = LightCurveCollection.read_parquet(tmp_path)
+    expected = lcs.data.sort_values(["asas_sn_id", "jd"]).reset_index(drop=True)
+    result = loaded.data.sort_values(["asas_sn_id", "jd"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False)
+    pd.testing.assert_frame_equal(loaded.catalog_info, lcs.catalog_info)
+
+    subset = LightCurveCollection.read_parquet(
+        tmp_path, columns=["jd", "mag"], filters=[("asas_sn_id", "in", [1, 3])]
+    )
+    assert list(subset.ids) == [1, 3]
+    assert set(subset.data["asas_sn_id"]) == {1, 3}
+
+
+def test_batch_lomb_scargle():
+    pytest.importorskip("nifty_ls")
+    lcs = make_collection()
+    frequency, power, ids = lcs.batch_lomb_scargle(
+        minimum_frequency=0.01, maximum_frequency=2, n_frequencies=500
+    )
+    assert power.shape == (len(ids), len(frequency))
+
+    data = lcs.data[(lcs.data["mag_err"] < 99) & (lcs.data["quality"] == "G")]
+    for row, id_ in zip(power, ids):
+        curve = data[data["asas_sn_id"] == id_]
+        expected = LombScargle(curve["jd"], curve["mag"]).power(frequency)
+        np.testing.assert_allclose(row, expected, atol=1e-7)
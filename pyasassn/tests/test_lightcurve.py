@@ -0,0 +1,47 @@
+from __future__ import division, print_function
+
+import numpy as np
+import pandas as pd
+from astropy.timeseries import LombScargle
+
+from ..lightcurve import LightCurve, _ls_fft_sums
+from ..utils import _ls_power
+
+
+def test_fft_sums_match_astropy():
+    rng = np.random.default_rng(0)
+    t = np.sort(2458000 + rng.random(200) * 1000)
+    y = 14 + 0.3 * np.sin(2 * np.pi * t / 0.77) + rng.normal(0, 0.1, 200)
+
+    ls = LombScargle(t, y)
+    frequency = ls.autofrequency(minimum_frequency=0.001, maximum_frequency=5)
+    power = _ls_power(*_ls_fft_sums(frequency, t, y))
+
+    expected = ls.power(frequency, method="cython")
+    assert np.abs(power - expected).max() < 1e-3
+    assert np.argmax(power) == np.argmax(expected)
+
+
+def test_lomb_scargle_cache_follows_data():
+    rng = np.random.default_rng(0)
+    t = np.sort(2458000 + rng.random(200) * 1000)
+    data = pd.DataFrame(
+        {
+            "jd": t,
+            "mag": 14 + 0.3 * np.sin(2 * np.pi * t / 0.77) + rng.normal(0, 0.1, 200),
+            "mag_err": np.full(200, 0.02),
+            "quality": "G",
+        }
+    )
+    lc = LightCurve(data, pd.DataFrame({"asas_sn_id": [1]}))
+
+    frequency, power, _ = lc.lomb_scargle(method="cython", plot=False)
+    frequency *= 2
+    power /= power.max()
+
+    # Edits in place are picked up rather than served from the cache
+    lc.data["mag"] = 14 + rng.normal(0, 0.1, 200)
+    frequency2, power2, _ = lc.lomb_scargle(method="cython", plot=False)
+    expected = LombScargle(lc.data["jd"], lc.data["mag"]).power(frequency2)
+    np.testing.assert_allclose(frequency2 * 2, frequency)
+    np.testing.assert_allclose(power2, expected, atol=1e-6)
@@ -0,0 +1,50 @@
+from __future__ import division, print_function
+
+import numpy as np
+import pytest
+from astropy.timeseries import LombScargle
+
+from ..wavelet import LS_wavelet, cupy, numba
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "numpy",
+        pytest.param("numba", marks=pytest.mark.skipif(numba is None, reason="numba not installed")),
+        pytest.param("cupy", marks=pytest.mark.skipif(cupy is None, reason="cupy not installed")),
+    ],
+)
+def test_wavelet_matches_astropy(backend):
+    rng = np.random.default_rng(0)
+    x = np.sort(2458000 + rng.random(300) * 100)
+    y = 14 + 0.2 * np.sin(2 * np.pi * x / 3.3) + rng.normal(0, 0.05, 300)
+    e_y = np.abs(rng.normal(0.03, 0.01, 300))
+    tt = np.linspace(x.min() + 20, x.max() - 20, 4)
+    ff = np.linspace(0.05, 1, 5)
+
+    acc = LS_wavelet(tt, ff, x, y, e_y, Γ=2, backend=backend)
+
+    # Reference: weighted astropy periodogram at every (t, ν)
+    for i, t in enumerate(tt):
+        for j, ν in enumerate(ff):
+            dt = 2 / ν
+            w = np.exp(-((x - t) / dt) ** 2 / 2)
+            with np.errstate(divide="ignore", over="ignore"):
+                dy = e_y / w
+            p = LombScargle(x, y, dy=dy).power(ν, normalization="psd", method="slow")
+            assert np.isclose(acc[i, j], p / (np.sqrt(2 * np.pi) * dt), rtol=1e-6)
+
+
+def test_wavelet_float32():
+    rng = np.random.default_rng(0)
+    x = np.sort(2458000 + rng.random(500) * 500)
+    y = 14 + 0.2 * np.sin(2 * np.pi * x / 3.3) + rng.normal(0, 0.05, 500)
+    e_y = np.abs(rng.normal(0.03, 0.01, 500))
+    tt = np.linspace(x.min() + 20, x.max() - 20, 20)
+    ff = np.linspace(0.05, 1, 50)
+
+    expected = LS_wavelet(tt, ff, x, y, e_y, backend="numpy")
+    acc = LS_wavelet(tt, ff, x, y, e_y, backend="numpy", dtype=np.float32)
+    assert acc.dtype == np.float64
+    assert np.max(np.abs(acc - expected)) < 1e-3 * np.max(expected)
@@ -1,3 +1,6 @@
+import numpy as np
+import pandas as pd
+
 Vcams = ["ba", "bb", "bc", "bd", "be", "bf", "bg", "bh"]
 gcams = [
     "bA",
@@ -23,3 +26,75 @@ gcams = [
     "bt",
     "cB"
 ]
+
+def _ls_power(sums, n, y_sum, y2_sum, fit_mean=True, center_data=True, normalization="standard"):
+    """
+    Generalised Lomb-Scargle power from raw (optionally weighted) trig sums.
+    Follows astropy's 'slow' implementation, using angle addition for the time shift tau.
+
+    :param sums: array of shape (..., 6) holding the sums of w*cos(wt), w*sin(wt), w*cos(2wt), w*sin(2wt),
+                 w*y*cos(wt) and w*y*sin(wt)
+    :param n: sum of the weights w (the number of epochs for unit weights), broadcastable to sums[..., 0]
+    :param y_sum: sum of w*y
+    :param y2_sum: sum of w*y^2
+    :return: power at each frequency
+    """
+    C, S, C2, S2, YC, YS = np.moveaxis(sums / np.expand_dims(n, -1), -1, 0)
+    Y = y_sum / n
+    YY = y2_sum / n
+
+    # Centering the data only shifts the y-weighted sums
+    if fit_mean or center_data:
+        YC = YC - Y * C
+        YS = YS - Y * S
+        YY = YY - Y * Y
+
+    CC = 0.5 * (1 + C2)
+    SS = 0.5 * (1 - C2)
+    CS = 0.5 * S2
+
+    if fit_mean:
+        S2 = S2 - 2 * S * C
+        C2 = C2 - (C * C - S * S)
+
+    # Rotate the sums by the time shift tau
+    phase = 0.5 * np.arctan2(S2, C2)
+    cos_tau = np.cos(phase)
+    sin_tau = np.sin(phase)
+    YC_tau = cos_tau * YC + sin_tau * YS
+    YS_tau = cos_tau * YS - sin_tau * YC
+    CC_tau = cos_tau**2 * CC + 2 * cos_tau * sin_tau * CS + sin_tau**2 * SS
+    SS_tau = cos_tau**2 * SS - 2 * cos_tau * sin_tau * CS + sin_tau**2 * CC
+
+    if fit_mean:
+        C_tau = cos_tau * C + sin_tau * S
+        S_tau = cos_tau * S - sin_tau * C
+        CC_tau -= C_tau * C_tau
+        SS_tau -= S_tau * S_tau
+
+    power = YC_tau * YC_tau / CC_tau + YS_tau * YS_tau / SS_tau
+
+    if normalization == "standard":
+        return power / YY
+    elif normalization == "model":
+        return power / (YY - power)
+    elif normalization == "log":
+        return -np.log(1 - power / YY)
+    elif normalization == "psd":
+        return power * 0.5 * n
+    else:
+        raise ValueError(f"normalization='{normalization}' not recognized")
+
+
+def _column_fingerprint(column):
+    """
+    Dtype and content hash of a column, to detect edits made in place.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        values = column.cat.codes.to_numpy()
+    elif pd.api.types.is_numeric_dtype(column.dtype):
+        values = column.to_numpy()
+    else:
+        # Text is hashed by value, as its object arrays are rebuilt on every conversion
+        values = pd.util.hash_array(column.to_numpy(dtype=object))
+    return column.dtype, hash(np.ascontiguousarray(values).tobytes())